@@ -9,5 +9,6 @@ from .simulation import (next_fast_len, gaussian_kernel, gaussian_filter,
                          fft_convolve, make_frames, median, median_filter)
 from .pyrost import (KR_reference, LOWESS_reference, pm_gsearch, pm_rsearch,
                      pm_devolution, tr_gsearch, pm_errors, pm_total_error,
-                     ref_errors, ref_total_error, ct_integrate)
+                     ref_errors, ref_total_error, ct_integrate, masked_sum,
+                     hist_quantile, frames_nonempty)
 from .pyfftw import FFTW, empty_aligned, zeros_aligned, ones_aligned
@@ -1,4 +1,4 @@
-from typing import Tuple, Sequence
+from typing import Optional, Tuple, Sequence
 import numpy as np
 
 def KR_reference(I_n: np.ndarray, W: np.ndarray, u: np.ndarray, di: np.ndarray,
@@ -522,3 +522,72 @@ def ct_integrate(sy_arr: np.ndarray, sx_arr: np.ndarray, num_threads: int=1) ->
                 5698-5704 (2012).
     """
     ...
+
+def masked_sum(inp: np.ndarray, mask: Optional[np.ndarray]=None, axis: int=0,
+               num_threads: int=1) -> np.ndarray:
+    """Calculate a sum of the `inp` values along the `axis`, where `mask` is True.
+    The input array is traversed in a single pass without allocating a masked
+    copy of `inp`.
+
+    Args:
+        inp : Input array. Must be of a boolean, an integer, or a real floating point
+            type.
+        mask : Input mask. Only the `inp` values, where `mask` is True, are summed.
+            The sum is calculated over the whole input array by default.
+        axis : Array axis along which the sum is calculated.
+        num_threads : Number of threads used in the calculations.
+
+    Raises:
+        ValueError : If `mask` and `inp` have different shapes.
+        ValueError : If `axis` is out of bounds.
+        TypeError : If `inp` has incompatible type.
+
+    Returns:
+        Array of sums along the given axis. Floating point sums are accumulated in
+        double precision and returned in the type of `inp`. The output type is
+        np.uint64 for unsigned integer inputs, and np.int64 for signed integer and
+        boolean inputs.
+    """
+    ...
+
+def hist_quantile(inp: np.ndarray, pmin: float, pmax: float, num_threads: int=1) -> Tuple[float, float]:
+    """Calculate the `pmin` and `pmax` percentiles of an integer array. The order
+    statistics are found with coarse-to-fine histograms of at most 65536 bins
+    instead of sorting the array, which takes a single pass over `inp` if the
+    range of values is small enough. The percentiles are linearly interpolated
+    in the same way as :func:`numpy.percentile` does by default.
+
+    Args:
+        inp : Input array. Must be one of the following types: np.int64, np.int32,
+            np.int16.
+        pmin : Lower percentile, must be in the range [0, 100].
+        pmax : Upper percentile, must be in the range [0, 100].
+        num_threads : Number of threads used in the calculations.
+
+    Raises:
+        ValueError : If `inp` is empty or the percentiles are out of range.
+        TypeError : If `inp` has incompatible type.
+
+    Returns:
+        A tuple of the lower and upper percentiles.
+    """
+    ...
+
+def frames_nonempty(inp: np.ndarray, num_threads: int=1) -> np.ndarray:
+    """Check which frames of a stack contain any nonzero values. Every frame is
+    scanned only until the first nonzero value is found, which usually takes a
+    small fraction of the frame for the measured data. Negative zeros are treated
+    as zeros and NaNs as nonzero values, the same as in :func:`numpy.any`.
+
+    Args:
+        inp : Stack of frames, the frames are indexed by the first axis.
+        num_threads : Number of threads used in the calculations.
+
+    Raises:
+        ValueError : If `inp` is zero-dimensional.
+
+    Returns:
+        Boolean array of the length equal to the number of frames, True if a frame
+        is nonempty.
+    """
+    ...
@@ -21,9 +21,34 @@ ctypedef fused uint_t:
     np.uint64_t
     np.uint32_t
 
+ctypedef fused data_t:
+    np.float64_t
+    np.float32_t
+    np.int64_t
+    np.int32_t
+    np.uint64_t
+    np.uint32_t
+    np.int16_t
+    np.uint16_t
+    np.int8_t
+    np.uint8_t
+
+ctypedef fused acc_t:
+    np.float64_t
+    np.int64_t
+    np.uint64_t
+
+ctypedef fused int_t:
+    np.int64_t
+    np.int32_t
+    np.int16_t
+
 DEF FLOAT_MAX = 1.7976931348623157e+308
 DEF M_1_SQRT2PI = 0.3989422804014327
 DEF CUTOFF = 3.0
+DEF BLOCK_SIZE = 1024
+DEF N_BINS = 65536
+DEF CHUNK_SIZE = 256
 
 cdef double Huber_loss(double a) nogil:
     cdef double aa = fabs(a)
@@ -910,4 +935,206 @@ def ct_integrate(float_t[:, ::1] sy_arr not None, float_t[:, ::1] sx_arr not Non
     sfx_asdi[0, 0] = 0.0 + 0.0j
     ifftw_obj._execute()
 
-    return np.asarray(sfx_asdi.real[a:, b:], dtype=sx_arr.base.dtype)
\ No newline at end of file
+    return np.asarray(sfx_asdi.real[a:, b:], dtype=sx_arr.base.dtype)
+
+def _masked_sum(acc_t[:, ::1] out, data_t[:, :, ::1] inp, np.uint8_t[:, :, ::1] mask, unsigned num_threads):
+    cdef Py_ssize_t a = inp.shape[0], n = inp.shape[1], b = inp.shape[2]
+    cdef Py_ssize_t n_blocks = (b + BLOCK_SIZE - 1) // BLOCK_SIZE
+    cdef Py_ssize_t t, i, j, k, j0, j1
+
+    for t in prange(a * n_blocks, schedule='static', num_threads=num_threads, nogil=True):
+        i = t // n_blocks
+        j0 = (t % n_blocks) * BLOCK_SIZE
+        j1 = j0 + BLOCK_SIZE if j0 + BLOCK_SIZE < b else b
+        for j in range(j0, j1):
+            out[i, j] = 0
+        for k in range(n):
+            for j in range(j0, j1):
+                if mask[i, k, j]:
+                    out[i, j] += <acc_t>inp[i, k, j]
+
+def masked_sum(np.ndarray inp not None, np.ndarray mask=None, int axis=0, unsigned num_threads=1):
+    if not np.PyArray_IS_C_CONTIGUOUS(inp):
+        inp = np.PyArray_GETCONTIGUOUS(inp)
+
+    cdef int ndim = inp.ndim
+    if axis < -ndim or axis >= ndim:
+        raise ValueError(f'axis {axis:d} is out of bounds for array of dimension {ndim:d}')
+    axis = axis if axis >= 0 else ndim + axis
+    cdef tuple shape = (<object>inp).shape
+
+    if mask is None:
+        mask = <np.ndarray>np.PyArray_SimpleNew(ndim, inp.shape, np.NPY_BOOL)
+        np.PyArray_FILLWBYTE(mask, 1)
+    else:
+        if (<object>mask).shape != shape:
+            raise ValueError('mask and inp arrays must have identical shapes')
+        mask = np.ascontiguousarray(mask, dtype=bool)
+
+    cdef int type_num
+    cdef object dtype = inp.dtype
+    if np.PyArray_TYPE(inp) == np.NPY_BOOL:
+        inp, type_num = inp.view(np.uint8), np.NPY_INT64
+    elif np.PyArray_TYPE(inp) == np.NPY_FLOAT16:
+        inp, type_num = inp.astype(np.float32), np.NPY_FLOAT64
+    elif np.PyArray_ISFLOAT(inp):
+        type_num = np.NPY_FLOAT64
+    elif np.PyArray_ISUNSIGNED(inp):
+        type_num = np.NPY_UINT64
+    elif np.PyArray_ISSIGNED(inp):
+        type_num = np.NPY_INT64
+    else:
+        raise TypeError(f'inp argument has incompatible type: {str(inp.dtype)}')
+
+    cdef np.npy_intp n_outer = np.prod(shape[:axis], dtype=np.intp)
+    cdef np.npy_intp n_inner = np.prod(shape[axis + 1:], dtype=np.intp)
+    cdef np.npy_intp *odims = [n_outer, n_inner]
+    cdef np.ndarray out = np.PyArray_SimpleNew(2, odims, type_num)
+
+    _masked_sum(out, inp.reshape(n_outer, shape[axis], n_inner),
+                mask.view(np.uint8).reshape(n_outer, shape[axis], n_inner), num_threads)
+
+    # Floating point sums are accumulated in double precision, but returned in the input type
+    if np.PyArray_ISFLOAT(out) and dtype != np.float64:
+        out = out.astype(dtype)
+    return out.reshape(shape[:axis] + shape[axis + 1:])
+
+cdef void int_histogram(np.npy_intp[:, ::1] hist, int_t[::1] inp, np.int64_t base, np.uint64_t span,
+                        int shift, unsigned num_threads) nogil:
+    cdef Py_ssize_t i, n = inp.shape[0]
+    cdef int t
+    cdef np.uint64_t u
+    for i in prange(n, schedule='static', num_threads=num_threads):
+        t = openmp.omp_get_thread_num()
+        u = <np.uint64_t>inp[i] - <np.uint64_t>base
+        if u <= span:
+            hist[t, u >> shift] += 1
+
+cdef double lerp(double a, double b, double t) nogil:
+    if t >= 0.5:
+        return b - (b - a) * (1.0 - t)
+    return a + (b - a) * t
+
+def _hist_quantile(int_t[::1] inp, double pmin, double pmax, unsigned num_threads):
+    cdef Py_ssize_t n = inp.shape[0], i
+    cdef int t, r, rr, shift, n_ranks = 4
+    cdef np.int64_t[::1] vmins = np.full(num_threads, inp[0], dtype=np.int64)
+    cdef np.int64_t[::1] vmaxs = np.full(num_threads, inp[0], dtype=np.int64)
+    for i in prange(n, schedule='static', num_threads=num_threads, nogil=True):
+        t = openmp.omp_get_thread_num()
+        if inp[i] < vmins[t]:
+            vmins[t] = inp[i]
+        if inp[i] > vmaxs[t]:
+            vmaxs[t] = inp[i]
+
+    # Positions of the percentiles in the sorted array, see numpy.percentile
+    cdef double h_min = (n - 1) * (pmin / 100.0), h_max = (n - 1) * (pmax / 100.0)
+    cdef np.npy_intp *ranks = [<np.npy_intp>floor(h_min), <np.npy_intp>ceil(h_min),
+                               <np.npy_intp>floor(h_max), <np.npy_intp>ceil(h_max)]
+    # The span is computed in C integers, it may exceed the range of int64
+    cdef np.int64_t vmin = np.min(vmins), vmax = np.max(vmaxs)
+    cdef np.int64_t *bases = [vmin, 0, 0, 0]
+    cdef np.uint64_t *spans = [<np.uint64_t>vmax - <np.uint64_t>vmin, 0, 0, 0]
+    for r in range(1, n_ranks):
+        bases[r] = bases[0]; spans[r] = spans[0]
+
+    # Narrow down the value range of every order statistic until it contains
+    # a single value, one histogram pass per range
+    cdef np.npy_intp[:, ::1] hist = np.empty((num_threads, N_BINS), dtype=np.intp)
+    cdef np.npy_intp cum
+    cdef np.int64_t base
+    cdef np.uint64_t span, b, n_bins
+    for r in range(n_ranks):
+        while spans[r]:
+            base, span, shift = bases[r], spans[r], 0
+            while (span >> shift) >= N_BINS:
+                shift += 1
+            n_bins = (span >> shift) + 1
+            hist[:, :n_bins] = 0
+            int_histogram(hist, inp, base, span, shift, num_threads)
+            for b in range(n_bins):
+                for t in range(1, <int>num_threads):
+                    hist[0, b] += hist[t, b]
+
+            for rr in range(r, n_ranks):
+                if bases[rr] == base and spans[rr] == span:
+                    cum, b = 0, 0
+                    while cum + hist[0, b] <= ranks[rr]:
+                        cum += hist[0, b]; b += 1
+                    ranks[rr] -= cum
+                    bases[rr] = <np.int64_t>(<np.uint64_t>base + (b << shift))
+                    spans[rr] = min(((<np.uint64_t>1) << shift) - 1, span - (b << shift))
+
+    return (lerp(bases[0], bases[1], h_min - floor(h_min)),
+            lerp(bases[2], bases[3], h_max - floor(h_max)))
+
+def hist_quantile(np.ndarray inp not None, double pmin, double pmax, unsigned num_threads=1):
+    if pmin < 0.0 or pmin > 100.0 or pmax < 0.0 or pmax > 100.0:
+        raise ValueError('Percentiles must be in the range [0, 100]')
+    if not np.PyArray_SIZE(inp):
+        raise ValueError('inp must be a non-empty array')
+
+    cdef int type_num = np.PyArray_TYPE(inp)
+    if type_num not in [np.NPY_INT64, np.NPY_INT32, np.NPY_INT16]:
+        raise TypeError(f'inp argument has incompatible type: {str(inp.dtype)}')
+
+    return _hist_quantile(np.PyArray_Ravel(inp, np.NPY_CORDER), pmin, pmax, max(num_threads, 1))
+
+cdef bint is_nonzero(unsigned char *ptr, np.npy_intp size) nogil:
+    cdef np.npy_intp i, j, n_chunks = size // CHUNK_SIZE
+    cdef unsigned char acc
+    for i in range(n_chunks):
+        acc = 0
+        for j in range(CHUNK_SIZE):
+            acc |= ptr[i * CHUNK_SIZE + j]
+        if acc:
+            return True
+    for j in range(n_chunks * CHUNK_SIZE, size):
+        if ptr[j]:
+            return True
+    return False
+
+cdef bint is_nonzero_float(unsigned char *ptr, np.npy_intp size, int item_size) nogil:
+    # The sign bit is ignored, negative zeros are zeros
+    cdef np.npy_intp j
+    if item_size == 8:
+        for j in range(size // 8):
+            if (<np.uint64_t *>ptr)[j] & (<np.uint64_t>0x7FFFFFFFFFFFFFFF):
+                return True
+    elif item_size == 4:
+        for j in range(size // 4):
+            if (<np.uint32_t *>ptr)[j] & (<np.uint32_t>0x7FFFFFFF):
+                return True
+    else:
+        for j in range(size // 2):
+            if (<np.uint16_t *>ptr)[j] & (<np.uint16_t>0x7FFF):
+                return True
+    return False
+
+def frames_nonempty(np.ndarray inp not None, unsigned num_threads=1):
+    if not np.PyArray_IS_C_CONTIGUOUS(inp):
+        inp = np.PyArray_GETCONTIGUOUS(inp)
+    if inp.ndim < 1:
+        raise ValueError('inp must be at least one-dimensional')
+
+    cdef np.npy_intp n_frames = inp.shape[0]
+    cdef np.ndarray out = np.PyArray_ZEROS(1, &n_frames, np.NPY_BOOL, 0)
+    if not np.PyArray_SIZE(inp):
+        return out
+
+    # Floating point values are compared by their magnitude bits
+    cdef int item_size = 0
+    if np.PyArray_ISFLOAT(inp) or np.PyArray_ISCOMPLEX(inp):
+        item_size = np.PyArray_ITEMSIZE(inp) // (2 if np.PyArray_ISCOMPLEX(inp) else 1)
+        if item_size not in [2, 4, 8] or not np.PyArray_ISNOTSWAPPED(inp):
+            return np.any(inp.reshape(n_frames, -1), axis=1)
+
+    cdef np.npy_intp i, frame_size = np.PyArray_NBYTES(inp) // n_frames
+    cdef unsigned char *_inp = <unsigned char *>np.PyArray_DATA(inp)
+    cdef np.npy_bool *_out = <np.npy_bool *>np.PyArray_DATA(out)
+    for i in prange(n_frames, schedule='guided', num_threads=num_threads, nogil=True):
+        if item_size:
+            _out[i] = is_nonzero_float(_inp + i * frame_size, frame_size, item_size)
+        else:
+            _out[i] = is_nonzero(_inp + i * frame_size, frame_size)
+    return out
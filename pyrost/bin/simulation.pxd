@@ -79,6 +79,11 @@ cdef extern from "median.h":
                         unsigned char *fmask, int mode, void *cval, int (*compar)(void*, void*),
                         unsigned threads) nogil
 
+    int median_filter_hist(void *out, unsigned long out_size, unsigned short *inp, unsigned char *mask,
+                           unsigned char *imask, int ndim, unsigned long *dims, unsigned long nbins,
+                           unsigned long *fsize, int mode, unsigned short cval, unsigned long offset,
+                           unsigned threads) nogil
+
 cdef extern from "fftw3.h":
     void fftw_init_threads() nogil
     void fftw_cleanup_threads() nogil
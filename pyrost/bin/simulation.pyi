@@ -27,7 +27,9 @@ def fft_convolve(array: np.ndarray, kernel: np.ndarray, axis: int=-1,
                  mode: str='constant', cval: float=0.0, backend: str='numpy',
                  num_threads: int=1) -> np.ndarray:
     """Convolve a multi-dimensional `array` with one-dimensional `kernel` along the
-    `axis` by means of FFT. Output has the same size as `array`.
+    `axis` by means of FFT. Output has the same size as `array`. Kernels that are
+    short compared to the `array` are convolved directly, which yields the same
+    result without the FFT overhead.
 
     Args:
         array : Input array.
@@ -380,7 +382,7 @@ def median(inp: np.ndarray, mask: Optional[np.ndarray]=None, axis: int=0, num_th
 def median_filter(inp: np.ndarray, size: Optional[Union[int, Tuple[int, ...]]]=None,
                   footprint: Optional[np.ndarray]=None, mask: Optional[np.ndarray]=None,
                   inp_mask: Optional[np.ndarray]=None, mode: str='reflect', cval: float=0.0,
-                  num_threads: int=1) -> np.ndarray:
+                  kind: str='sort', num_threads: int=1) -> np.ndarray:
     """Calculate a multidimensional median filter.
 
     Args:
@@ -417,10 +419,21 @@ def median_filter(inp: np.ndarray, size: Optional[Union[int, Tuple[int, ...]]]=N
             * `wrap`, (a b c d | a b c d | a b c d) : The input is extended by wrapping around
               to the opposite edge.
         cval : Value to fill past edges of input if mode is 'constant'. Default is 0.0.
+        kind : Median calculation algorithm. The valid values are as follows:
+
+            * `sort` : Select the median out of the values in the footprint at every
+              element position.
+            * `histogram` : Slide a histogram of the values in the footprint along the
+              last axis (Huang's algorithm). The cost per element doesn't depend on the
+              footprint size along the last axis. Applies to integer inputs with a
+              rectangular footprint and a range of values no wider than 65536, falls back
+              to `sort` otherwise.
+
         num_threads : Number of threads used in the calculations.
 
     Raises:
         ValueError : When neither `size` nor `footprint` are provided.
+        ValueError : If `kind` is invalid.
         TypeError : If `data` has incompatible type.
         RuntimeError : If C backend exited with error.
 
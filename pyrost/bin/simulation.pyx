@@ -372,7 +372,9 @@ def median(np.ndarray inp not None, np.ndarray mask=None, int axis=0, unsigned n
 
 def median_filter(np.ndarray inp not None, object size=None, np.ndarray footprint=None,
                   np.ndarray mask=None, np.ndarray inp_mask=None, str mode='reflect', double cval=0.0,
-                  unsigned num_threads=1):
+                  str kind='sort', unsigned num_threads=1):
+    if kind not in ['sort', 'histogram']:
+        raise ValueError(f'Invalid kind keyword: {kind}')
     if not np.PyArray_IS_C_CONTIGUOUS(inp):
         inp = np.PyArray_GETCONTIGUOUS(inp)
 
@@ -413,14 +415,42 @@ def median_filter(np.ndarray inp not None, object size=None, np.ndarray footprin
 
     cdef unsigned long *_dims = <unsigned long *>dims
     cdef int type_num = np.PyArray_TYPE(inp)
-    cdef np.ndarray out = <np.ndarray>np.PyArray_SimpleNew(ndim, dims, type_num)
-    cdef void *_out = <void *>np.PyArray_DATA(out)
+    cdef np.ndarray out
+    cdef void *_out
     cdef void *_inp = <void *>np.PyArray_DATA(inp)
     cdef unsigned char *_mask = <unsigned char *>np.PyArray_DATA(mask)
     cdef unsigned char *_imask = <unsigned char *>np.PyArray_DATA(inp_mask)
     cdef int _mode = mode_to_code(mode)
     cdef void *_cval = <void *>&cval
 
+    cdef np.ndarray bins
+    cdef unsigned long nbins, offset
+    cdef unsigned short _cbin
+    if kind == 'histogram' and np.PyArray_ISINTEGER(inp) and np.PyArray_SIZE(inp) and np.all(footprint):
+        vmin, vmax = int(inp.min()), int(inp.max())
+        if _mode == EXTEND_CONSTANT:
+            vmin, vmax = min(vmin, int(cval)), max(vmax, int(cval))
+
+        # Values are stored as bins relative to vmin, the histogram path is taken
+        # only if every value fits into a 16-bit bin
+        if vmax - vmin < 65536:
+            bins = np.subtract(inp, np.uint16(vmin & 0xFFFF), dtype=np.uint16, casting='unsafe')
+            nbins, offset = vmax - vmin + 1, vmin & 0xFFFFFFFFFFFFFFFF
+            _cbin = int(cval) - vmin if _mode == EXTEND_CONSTANT else 0
+
+            # The medians are written straight into the output of the input type
+            out = <np.ndarray>np.PyArray_SimpleNew(ndim, dims, type_num)
+            with nogil:
+                fail = median_filter_hist(np.PyArray_DATA(out), np.PyArray_ITEMSIZE(out),
+                                          <unsigned short *>np.PyArray_DATA(bins), _mask, _imask,
+                                          ndim, _dims, nbins, _fsize, _mode, _cbin, offset, num_threads)
+            if fail:
+                raise RuntimeError('C backend exited with error.')
+
+            return out
+
+    out = <np.ndarray>np.PyArray_SimpleNew(ndim, dims, type_num)
+    _out = <void *>np.PyArray_DATA(out)
     with nogil:
         if type_num == np.NPY_FLOAT64:
             fail = median_filter_c(_out, _inp, _mask, _imask, ndim, _dims, 8, _fsize, _fmask, _mode, _cval, compare_double, num_threads)
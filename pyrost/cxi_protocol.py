@@ -516,7 +516,23 @@ class CXIStore():
 
     @staticmethod
     def _read_worker_frame(index: np.ndarray, ss_idxs: Indices, fs_idxs: Indices) -> np.ndarray:
-        return h5py.File(index[0])[index[1]][index[2]][..., ss_idxs, fs_idxs]
+        dset = h5py.File(index[0])[index[1]]
+        if isinstance(ss_idxs, slice) and isinstance(fs_idxs, slice):
+            # Read only the selected hyperslab, HDF5 doesn't support negative steps
+            ss_read, ss_flip = CXIStore._forward_slice(ss_idxs, dset.shape[-2])
+            fs_read, fs_flip = CXIStore._forward_slice(fs_idxs, dset.shape[-1])
+            frame = dset[np.index_exp[index[2]] + (Ellipsis, ss_read, fs_read)]
+            return np.ascontiguousarray(frame[..., ::-1 if ss_flip else 1, ::-1 if fs_flip else 1])
+        return dset[index[2]][..., ss_idxs, fs_idxs]
+
+    @staticmethod
+    def _forward_slice(slc: slice, size: int) -> Tuple[slice, bool]:
+        rng = range(*slc.indices(size))
+        if not rng:
+            return slice(0, 0), False
+        if rng.step > 0:
+            return slice(rng.start, rng.stop, rng.step), False
+        return slice(rng[-1], rng[0] + 1, -rng.step), True
 
     def _load_stack(self, attr: str, idxs: Optional[Indices], ss_idxs: Indices,
                     fs_idxs: Indices, processes: int, verbose: bool) -> np.ndarray:
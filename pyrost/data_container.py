@@ -1,11 +1,25 @@
 """:class:`DataContainer` class implementation.
 """
 from __future__ import annotations
+import os
+from multiprocessing import cpu_count
 from typing import (Any, Callable, Dict, ItemsView, Iterable, Iterator,
                     List, Optional, ValuesView, TypeVar, Type)
 
 T = TypeVar('T')
 
+def _available_cpus() -> int:
+    """Return the number of CPUs the current process is allowed to run on.
+    Respects the affinity mask set by ``taskset``, cgroups or a batch scheduler
+    where the platform supports it.
+
+    Returns:
+        Number of available CPUs.
+    """
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return cpu_count()
+
 class BoundMethod:
     __func__: Callable[..., Dict]
     __self__: T
@@ -16,23 +16,156 @@ Examples:
     >>> data = data.load()
 """
 from __future__ import annotations
+from copy import copy
 from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 from weakref import ref
-from multiprocessing import cpu_count
 from tqdm.auto import tqdm
 import numpy as np
 from .aberrations_fit import AberrationsFit
-from .data_container import DataContainer, dict_to_object
+from .data_container import DataContainer, dict_to_object, _available_cpus
 from .cxi_protocol import CXIStore, Indices
 from .rst_update import SpeckleTracking
-from .bin import median, median_filter, fft_convolve, ct_integrate
+from .bin import (median, median_filter, ct_integrate, masked_sum, hist_quantile,
+                  frames_nonempty)
+
+def range_to_slice(rng: range) -> slice:
+    """Convert a range of indices into a slice that selects the same
+    elements from a sequence of length ``max(rng) + 1`` or longer.
+
+    Args:
+        rng : Range of non-negative indices.
+
+    Returns:
+        Equivalent slice object.
+    """
+    if not rng:
+        return slice(0, 0)
+    if rng.stop < 0:
+        return slice(rng.start, None, rng.step)
+    return slice(rng.start, rng.stop, rng.step)
+
+def _box_mean(arr: np.ndarray, size: int, axes: Iterable[int],
+              out: Optional[np.ndarray]=None) -> np.ndarray:
+    # Moving average with the 'reflect' boundary condition by means of cumulative sums
+    if out is None:
+        out = np.array(arr, dtype=np.float64)
+    elif out is not arr:
+        np.copyto(out, arr)
+    for axis in axes:
+        pad_width = [(0, 0)] * out.ndim
+        pad_width[axis] = (size // 2, (size - 1) // 2)
+        csum = np.moveaxis(np.pad(out, pad_width, mode='symmetric'), axis, 0)
+        np.cumsum(csum, axis=0, out=csum)
+        mean = np.moveaxis(out, axis, 0)
+        mean[0] = csum[size - 1]
+        np.subtract(csum[size:], csum[:-size], out=mean[1:])
+        mean /= size
+    return out
+
+def slice_indices(ss_idxs: np.ndarray, fs_idxs: np.ndarray, slices: Tuple[slice, slice],
+                  shape: Tuple[int, int]) -> Tuple[np.ndarray, np.ndarray]:
+    """Apply a pair of slices to the indices of a frame `(ss_idxs, fs_idxs)`. The
+    index arrays may be sparse, e.g. of shapes `(H, 1)` and `(1, W)`, an axis
+    broadcasted against the frame's `shape` is left untouched.
+
+    Args:
+        ss_idxs: Slow axis indices of a frame.
+        fs_idxs: Fast axis indices of a frame.
+        slices : A tuple of slices along the slow and fast axes.
+        shape : Shape of the frame.
+
+    Returns:
+        A tuple of sliced frame indices `(ss_idxs, fs_idxs)`.
+    """
+    def apply(idxs: np.ndarray) -> np.ndarray:
+        return idxs[(Ellipsis,) + tuple(slc if size == length else slice(None)
+                                        for slc, size, length
+                                        in zip(slices, idxs.shape[-2:], shape))]
+    return apply(ss_idxs), apply(fs_idxs)
 
 class Transform():
     """Abstract transform class."""
 
+    def _state_key(self) -> Tuple:
+        def freeze(value: Any) -> Any:
+            if isinstance(value, Transform):
+                return value._state_key()
+            if isinstance(value, dict):
+                return tuple((key, freeze(val)) for key, val in value.items())
+            if isinstance(value, (list, tuple, np.ndarray)):
+                return tuple(freeze(val) for val in value)
+            return value
+
+        return (type(self).__name__, freeze(self.state_dict()))
+
+    def _get_cache(self) -> Dict:
+        # The cache is keyed by a snapshot of the state, so that in-place changes
+        # of the attributes (e.g. of a list of transforms) discard the cached results
+        state = self._state_key()
+        cache = self.__dict__.get('_cache')
+        if cache is None or cache[0] != state:
+            cache = self.__dict__['_cache'] = (state, {})
+        return cache[1]
+
     def index_array(self, ss_idxs: np.ndarray, fs_idxs: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
         raise NotImplementedError
 
+    def slices(self, shape: Tuple[int, int]) -> Optional[Tuple[slice, slice]]:
+        """Return a pair of slices `(ss_slice, fs_slice)` equivalent to the
+        transform of a frame of the given shape. Return None if the transform
+        can't be expressed by slicing.
+
+        Args:
+            shape : Shape of the frame.
+
+        Returns:
+            A tuple of slices along the slow and fast axes, or None.
+        """
+        return None
+
+    def indexed(self, shape: Tuple[int, int], dtype: np.dtype=np.intp) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the transformed indices `(ss_idxs, fs_idxs)` of a frame of the
+        given shape. The index arrays are computed once per `(shape, dtype)` and
+        cached until the state of the transform changes. The returned arrays are
+        read-only.
+
+        Args:
+            shape : Shape of the frame.
+            dtype : Data type of the index arrays.
+
+        Returns:
+            A tuple of transformed frame indices `(ss_idxs, fs_idxs)`.
+        """
+        key = ('indexed', tuple(shape), np.dtype(dtype))
+        cache = self._get_cache()
+        if key not in cache:
+            slices = self.slices(shape)
+            if slices is None:
+                ss_idxs, fs_idxs = self.index_array(*np.indices(shape, dtype=dtype))
+            else:
+                # Only the selected rows and columns are generated, not the full grid
+                ss_idxs = np.arange(shape[0], dtype=dtype)[slices[0], None]
+                fs_idxs = np.arange(shape[1], dtype=dtype)[None, slices[1]]
+                ss_idxs, fs_idxs = np.broadcast_arrays(ss_idxs, fs_idxs)
+            ss_idxs.flags.writeable = False
+            fs_idxs.flags.writeable = False
+            cache[key] = (ss_idxs, fs_idxs)
+        return cache[key]
+
+    def __copy__(self) -> Transform:
+        # Mutable attributes are copied and the cache isn't shared with the copy
+        obj = self.__class__.__new__(self.__class__)
+        for name, value in self.__dict__.items():
+            if name != '_cache':
+                if isinstance(value, (list, np.ndarray)):
+                    value = value.copy()
+                obj.__dict__[name] = value
+        return obj
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        self.__dict__.pop('_cache', None)
+        super().__setattr__(name, value)
+
     def __repr__(self) -> str:
         return self.state_dict().__repr__()
 
@@ -48,9 +181,12 @@ class Transform():
         Returns:
             Transformed image.
         """
-        ss_idxs, fs_idxs = np.indices(inp.shape[-2:])
-        ss_idxs, fs_idxs = self.index_array(ss_idxs, fs_idxs)
-        return inp[..., ss_idxs, fs_idxs]
+        slices = self.slices(inp.shape[-2:])
+        if slices is None:
+            ss_idxs, fs_idxs = np.indices(inp.shape[-2:])
+            ss_idxs, fs_idxs = self.index_array(ss_idxs, fs_idxs)
+            return inp[..., ss_idxs, fs_idxs]
+        return inp[(Ellipsis,) + slices]
 
     def state_dict(self) -> Dict[str, Any]:
         raise NotImplementedError
@@ -76,16 +212,26 @@ class Crop(Transform):
         Returns:
             A tuple of filtered frame indices `(ss_idxs, fs_idxs)`.
         """
-        if ss_idxs.shape[0] == 1:
-            return (ss_idxs[:, self.roi[2]:self.roi[3]],
-                    fs_idxs[:, self.roi[2]:self.roi[3]])
+        shape = np.broadcast(ss_idxs, fs_idxs).shape[-2:]
+        return slice_indices(ss_idxs, fs_idxs, self.slices(shape), shape)
+
+    def slices(self, shape: Tuple[int, int]) -> Tuple[slice, slice]:
+        """Return a pair of slices `(ss_slice, fs_slice)` equivalent to the
+        cropping transform.
+
+        Args:
+            shape : Shape of the frame.
+
+        Returns:
+            A tuple of slices along the slow and fast axes.
+        """
+        if shape[0] == 1:
+            return (slice(None), slice(self.roi[2], self.roi[3]))
 
-        if ss_idxs.shape[1] == 1:
-            return (ss_idxs[self.roi[0]:self.roi[1], :],
-                    fs_idxs[self.roi[0]:self.roi[1], :])
+        if shape[1] == 1:
+            return (slice(self.roi[0], self.roi[1]), slice(None))
 
-        return (ss_idxs[self.roi[0]:self.roi[1], self.roi[2]:self.roi[3]],
-                fs_idxs[self.roi[0]:self.roi[1], self.roi[2]:self.roi[3]])
+        return (slice(self.roi[0], self.roi[1]), slice(self.roi[2], self.roi[3]))
 
     def state_dict(self) -> Dict[str, Any]:
         """Returns the state of the transform as a dict.
@@ -115,7 +261,20 @@ class Downscale(Transform):
         Returns:
             A tuple of filtered frame indices `(ss_idxs, fs_idxs)`.
         """
-        return (ss_idxs[::self.scale, ::self.scale], fs_idxs[::self.scale, ::self.scale])
+        shape = np.broadcast(ss_idxs, fs_idxs).shape[-2:]
+        return slice_indices(ss_idxs, fs_idxs, self.slices(shape), shape)
+
+    def slices(self, shape: Tuple[int, int]) -> Tuple[slice, slice]:
+        """Return a pair of slices `(ss_slice, fs_slice)` equivalent to the
+        downscaling transform.
+
+        Args:
+            shape : Shape of the frame.
+
+        Returns:
+            A tuple of slices along the slow and fast axes.
+        """
+        return (slice(None, None, self.scale), slice(None, None, self.scale))
 
     def state_dict(self) -> Dict[str, Any]:
         """Returns the state of the transform as a dict.
@@ -147,10 +306,23 @@ class Mirror(Transform):
         Returns:
             A tuple of filtered frame indices `(ss_idxs, fs_idxs)`.
         """
+        shape = np.broadcast(ss_idxs, fs_idxs).shape[-2:]
+        return slice_indices(ss_idxs, fs_idxs, self.slices(shape), shape)
+
+    def slices(self, shape: Tuple[int, int]) -> Tuple[slice, slice]:
+        """Return a pair of slices `(ss_slice, fs_slice)` equivalent to the
+        mirroring transform.
+
+        Args:
+            shape : Shape of the frame.
+
+        Returns:
+            A tuple of slices along the slow and fast axes.
+        """
         if self.axis == 0:
-            return (ss_idxs[::-1], fs_idxs[::-1])
+            return (slice(None, None, -1), slice(None))
         if self.axis == 1:
-            return (ss_idxs[:, ::-1], fs_idxs[:, ::-1])
+            return (slice(None), slice(None, None, -1))
         raise ValueError('Axis must equal to 0 or 1')
 
     def state_dict(self) -> Dict[str, Any]:
@@ -170,16 +342,14 @@ class ComposeTransforms(Transform):
     transforms : List[Transform]
 
     def __init__(self, transforms: List[Transform]) -> None:
-        self.transforms = []
         try:
-            for transform in transforms:
-                pdict = transform.state_dict()
-                self.transforms.append(type(transform)(**pdict))
+            self.transforms = [copy(transform) for transform in transforms]
         except TypeError:
             raise TypeError('Invalid argument, must be a sequence of transforms.')
-        else:
-            if len(self.transforms) < 2:
-                raise ValueError('Two or more transforms are needed to compose.')
+        if not all(isinstance(transform, Transform) for transform in self.transforms):
+            raise TypeError('Invalid argument, must be a sequence of transforms.')
+        if len(self.transforms) < 2:
+            raise ValueError('Two or more transforms are needed to compose.')
 
 
     def __iter__(self) -> Iterator[Transform]:
@@ -199,9 +369,40 @@ class ComposeTransforms(Transform):
         Returns:
             A tuple of filtered frame indices `(ss_idxs, fs_idxs)`.
         """
+        shape = np.broadcast(ss_idxs, fs_idxs).shape[-2:]
+        slices = self.slices(shape)
+        if slices is None:
+            for transform in self:
+                ss_idxs, fs_idxs = transform.index_array(ss_idxs, fs_idxs)
+            return ss_idxs, fs_idxs
+        return slice_indices(ss_idxs, fs_idxs, slices, shape)
+
+    def slices(self, shape: Tuple[int, int]) -> Optional[Tuple[slice, slice]]:
+        """Return a pair of slices `(ss_slice, fs_slice)` equivalent to the
+        composed transform. Return None if any of the transforms can't be
+        expressed by slicing. The chain of transforms is folded into a single
+        pair of slices once per frame shape.
+
+        Args:
+            shape : Shape of the frame.
+
+        Returns:
+            A tuple of slices along the slow and fast axes, or None.
+        """
+        key = ('slices', tuple(shape))
+        cache = self._get_cache()
+        if key not in cache:
+            cache[key] = self._compile(shape)
+        return cache[key]
+
+    def _compile(self, shape: Tuple[int, int]) -> Optional[Tuple[slice, slice]]:
+        ranges = (range(shape[0]), range(shape[1]))
         for transform in self:
-            ss_idxs, fs_idxs = transform.index_array(ss_idxs, fs_idxs)
-        return ss_idxs, fs_idxs
+            slices = transform.slices((len(ranges[0]), len(ranges[1])))
+            if slices is None:
+                return None
+            ranges = (ranges[0][slices[0]], ranges[1][slices[1]])
+        return (range_to_slice(ranges[0]), range_to_slice(ranges[1]))
 
     def state_dict(self) -> Dict[str, Any]:
         """Returns the state of the transform as a dict.
@@ -302,21 +503,27 @@ class STData(DataContainer):
         super(STData, self).__init__(input_file=input_file, output_file=output_file,
                                      transform=transform, **kwargs)
 
-        self._init_functions(num_threads=lambda: np.clip(1, 64, cpu_count()))
+        self._init_functions(num_threads=lambda: np.clip(1, 64, _available_cpus()))
         if self.shape[0] > 0:
             self._init_functions(good_frames=lambda: np.arange(self.shape[0]))
         if self._isdata:
             self._init_functions(mask=lambda: np.ones(self.shape, dtype=bool))
-            func = lambda: median(inp=self.data[self.good_frames], axis=0,
-                                  mask=self.mask[self.good_frames],
-                                  num_threads=self.num_threads)
-            self._init_functions(whitefield=func)
+            self._init_functions(whitefield=self._whitefield)
         if self._isdefocus:
             self._init_functions(defocus_y=lambda: self.get('defocus_x', None),
                                  pixel_translations=self._pixel_translations)
 
         self._init_attributes()
 
+    @property
+    def _frame_shape(self) -> Tuple[int, int]:
+        # Reading the shape requires to index all of the input files
+        if '_frame_shape' not in self.__dict__:
+            with self.input_file:
+                self.input_file.update_indices()
+                self.__dict__['_frame_shape'] = self.input_file.read_shape()
+        return self.__dict__['_frame_shape']
+
     @property
     def _isdata(self) -> bool:
         return self.data is not None
@@ -329,32 +536,55 @@ class STData(DataContainer):
     def _isphase(self) -> bool:
         return not self.pixel_aberrations is None and not self.phase is None
 
+    def __setattr__(self, attr: str, value: Any) -> None:
+        if attr in self:
+            self.__dict__.pop('_shape', None)
+        if attr == 'basis_vectors':
+            self.__dict__.pop('_bv_norm_sq', None)
+        if attr == 'input_file':
+            self.__dict__.pop('_frame_shape', None)
+        super(STData, self).__setattr__(attr, value)
+
     @property
     def shape(self) -> Tuple[int, int, int]:
-        shape = [0, 0, 0]
-        for attr, data in self.items():
-            if attr in self.input_file.protocol and data is not None:
-                kind = self.input_file.protocol.get_kind(attr)
-                if kind == 'sequence':
-                    shape[0] = data.shape[0]
-
-        for attr, data in self.items():
-            if attr in self.input_file.protocol and data is not None:
-                kind = self.input_file.protocol.get_kind(attr)
-                if kind == 'frame':
-                    shape[1:] = data.shape
-
-        for attr, data in self.items():
-            if attr in self.input_file.protocol and data is not None:
-                kind = self.input_file.protocol.get_kind(attr)
+        if '_shape' not in self.__dict__:
+            protocol = self.input_file.protocol
+            n_frames, frame_shape, stack_shape = 0, (0, 0), None
+            for attr, data in self.items():
+                if data is None or attr not in protocol:
+                    continue
+                kind = protocol.get_kind(attr)
                 if kind == 'stack':
-                    shape[:] = data.shape
-        return tuple(shape)
+                    stack_shape = data.shape
+                elif kind == 'frame':
+                    frame_shape = data.shape
+                elif kind == 'sequence':
+                    n_frames = data.shape[0]
+            if stack_shape is None:
+                stack_shape = (n_frames,) + tuple(frame_shape)
+            self.__dict__['_shape'] = tuple(stack_shape)
+        return self.__dict__['_shape']
+
+    def _whitefield(self) -> np.ndarray:
+        if np.array_equal(self.good_frames, np.arange(self.data.shape[0])):
+            return median(inp=self.data, axis=0, mask=self.mask, num_threads=self.num_threads)
+        # Exclude bad frames by the mask rather than copying a subset of data
+        frames = np.zeros(self.data.shape[0], dtype=bool)
+        frames[self.good_frames] = True
+        return median(inp=self.data, axis=0, mask=self.mask & frames[:, None, None],
+                      num_threads=self.num_threads)
+
+    @property
+    def _bv_norm_sq(self) -> np.ndarray:
+        if '_bv_norm_sq' not in self.__dict__:
+            self.__dict__['_bv_norm_sq'] = np.einsum('njk,njk->nj', self.basis_vectors,
+                                                     self.basis_vectors)
+        return self.__dict__['_bv_norm_sq']
 
     def _pixel_translations(self) -> np.ndarray:
-        pixel_translations = (self.translations[:, None] * self.basis_vectors).sum(axis=-1)
-        mag = np.abs(self.distance / np.array([self.defocus_y, self.defocus_x]))
-        pixel_translations *= mag / (self.basis_vectors**2).sum(axis=-1)
+        pixel_translations = np.einsum('nk,njk->nj', self.translations, self.basis_vectors)
+        pixel_translations *= np.abs(self.distance / np.array([self.defocus_y, self.defocus_x]))
+        pixel_translations /= self._bv_norm_sq
         pixel_translations -= pixel_translations[0]
         pixel_translations -= pixel_translations.mean(axis=0)
         return pixel_translations
@@ -368,9 +598,7 @@ class STData(DataContainer):
         Returns:
             Pixel mapping array.
         """
-        with self.input_file:
-            self.input_file.update_indices()
-            shape = self.input_file.read_shape()
+        shape = self._frame_shape
 
         # Check if STData is integrated
         if self.shape[1] == 1:
@@ -378,17 +606,17 @@ class STData(DataContainer):
         if self.shape[2] == 1:
             shape = (shape[0], 1)
 
-        ss_idxs, fs_idxs = np.indices(shape, dtype=dtype)
         if self.transform:
-            ss_idxs, fs_idxs = self.transform.index_array(ss_idxs, fs_idxs)
-        pixel_map = np.stack((ss_idxs, fs_idxs))
+            ss_idxs, fs_idxs = self.transform.indexed(shape, dtype)
+        else:
+            ss_idxs, fs_idxs = np.indices(shape, dtype=dtype, sparse=True)
 
         if self._isdefocus:
             if self.defocus_y < 0.0:
-                pixel_map = np.flip(pixel_map, axis=1)
+                ss_idxs, fs_idxs = ss_idxs[::-1], fs_idxs[::-1]
             if self.defocus_x < 0.0:
-                pixel_map = np.flip(pixel_map, axis=2)
-        return np.asarray(pixel_map, order='C')
+                ss_idxs, fs_idxs = ss_idxs[:, ::-1], fs_idxs[:, ::-1]
+        return np.stack(np.broadcast_arrays(ss_idxs, fs_idxs))
 
     @dict_to_object
     def load(self, attributes: Union[str, List[str], None]=None, idxs: Optional[Iterable[int]]=None,
@@ -423,22 +651,25 @@ class STData(DataContainer):
                 idxs = self.input_file.indices()
             data_dict = {'frames': idxs, 'good_frames': None}
 
+            ss_idxs, fs_idxs = slice(None), slice(None)
+            if self.transform and shape[0] * shape[1]:
+                slices = self.transform.slices(shape)
+                if slices is None:
+                    ss_idxs, fs_idxs = self.transform.indexed(shape)
+                else:
+                    ss_idxs, fs_idxs = slices
+
             for attr in attributes:
                 if attr not in self.input_file.keys():
                     raise ValueError(f"No '{attr}' attribute in the input files")
                 if attr not in self.init_set:
                     raise ValueError(f"Invalid attribute: '{attr}'")
 
-                if self.transform and shape[0] * shape[1]:
-                    ss_idxs, fs_idxs = np.indices(shape)
-                    ss_idxs, fs_idxs = self.transform.index_array(ss_idxs, fs_idxs)
-                    data = self.input_file.load_attribute(attr, idxs=idxs, ss_idxs=ss_idxs, fs_idxs=fs_idxs,
-                                                          processes=processes, verbose=verbose)
-                else:
-                    data = self.input_file.load_attribute(attr, idxs=idxs, processes=processes,
-                                                          verbose=verbose)
-
-                data_dict[attr] = data
+            for attr in attributes:
+                data_dict[attr] = self.input_file.load_attribute(attr, idxs=idxs, ss_idxs=ss_idxs,
+                                                                 fs_idxs=fs_idxs,
+                                                                 processes=processes,
+                                                                 verbose=verbose)
 
         return data_dict
 
@@ -470,6 +701,12 @@ class STData(DataContainer):
         if attributes is None:
             attributes = list(self.contents())
 
+        # A contiguous run of good frames is selected with a slice to avoid a copy
+        good_frames = self.good_frames
+        if isinstance(good_frames, np.ndarray) and good_frames.ndim == 1 and good_frames.size and \
+           np.all(np.diff(good_frames) == 1):
+            good_frames = slice(good_frames[0], good_frames[-1] + 1)
+
         with self.output_file:
             for attr in self.output_file.protocol.str_to_list(attributes):
                 data = self.get(attr)
@@ -477,7 +714,7 @@ class STData(DataContainer):
                     kind = self.output_file.protocol.get_kind(attr)
 
                     if kind in ['stack', 'sequence']:
-                        data = data[self.good_frames]
+                        data = data[good_frames]
 
                     self.output_file.save_attribute(attr, np.asarray(data), mode=mode, idxs=idxs)
 
@@ -536,7 +773,8 @@ class STData(DataContainer):
                     if kind in ['stack', 'frame']:
                         data_dict[attr] = None
 
-            data_dict['data'] = (self.data * self.mask).sum(axis=axis - 2, keepdims=True)
+            data = masked_sum(self.data, self.mask, axis=axis - 2, num_threads=self.num_threads)
+            data_dict['data'] = np.expand_dims(data, axis - 2)
 
             return data_dict
 
@@ -556,8 +794,11 @@ class STData(DataContainer):
             `whitefield`.
         """
         if good_frames is None:
-            good_frames = np.where(self.data.sum(axis=(1, 2)) > 0)[0]
-        return {'good_frames': np.asarray(good_frames), 'whitefield': None}
+            good_frames = np.flatnonzero(frames_nonempty(self.data, num_threads=self.num_threads))
+        good_frames = np.asarray(good_frames)
+        if np.array_equal(good_frames, self.good_frames):
+            return {'good_frames': good_frames}
+        return {'good_frames': good_frames, 'whitefield': None}
 
     @dict_to_object
     def update_mask(self, method: str='perc-bad', pmin: float=0., pmax: float=99.99,
@@ -584,29 +825,30 @@ class STData(DataContainer):
         Returns:
             New :class:`STData` object with the updated `mask`.
         """
-        if update == 'reset':
-            data = self.data
-        elif update == 'multiply':
-            data = self.data * self.mask
-        else:
+        if update not in ['reset', 'multiply']:
             raise ValueError(f'Invalid update keyword: {update:s}')
 
+        # Masked out pixels are dropped by the final product with the old mask
+        # in the 'multiply' mode, the masked data is needed only for filtering
         if method == 'no-bad':
             mask = np.ones(self.shape, dtype=bool)
         elif method == 'range-bad':
-            mask = (data >= vmin) & (data < vmax)
+            mask = self.data >= vmin
+            np.logical_and(mask, self.data < vmax, out=mask)
         elif method == 'perc-bad':
-            average = median_filter(data, (1, 3, 3), num_threads=self.num_threads)
-            offsets = (data.astype(np.int32) - average.astype(np.int32))
-            mask = (offsets >= np.percentile(offsets, pmin)) & \
-                   (offsets <= np.percentile(offsets, pmax))
+            data = self.data * self.mask if update == 'multiply' else self.data
+            average = median_filter(data, (1, 3, 3), kind='histogram', num_threads=self.num_threads)
+            offsets = np.subtract(data, average, dtype=np.int32, casting='unsafe')
+            omin, omax = hist_quantile(offsets, pmin, pmax, num_threads=self.num_threads)
+            mask = offsets >= omin
+            np.logical_and(mask, offsets <= omax, out=mask)
         else:
             ValueError('invalid method argument')
 
         if update == 'reset':
             return {'mask': mask, 'whitefield': None}
         if update == 'multiply':
-            return {'mask': mask * self.mask, 'whitefield': None}
+            return {'mask': np.logical_and(mask, self.mask, out=mask), 'whitefield': None}
         raise ValueError(f'Invalid update keyword: {update}')
 
     @dict_to_object
@@ -683,10 +925,10 @@ class STData(DataContainer):
         if st_obj.parent() is not self:
             raise ValueError("'st_obj' wasn't derived from this data container")
         # Update phase, pixel_aberrations, and reference_image
-        dpm_y, dpm_x = (st_obj.pixel_map - self.pixel_map())
-        dpm_y -= dpm_y.mean()
-        dpm_x -= dpm_x.mean()
-        self.pixel_aberrations = np.stack((dpm_y, dpm_x))
+        pixel_aberrations = self.pixel_map()
+        np.subtract(st_obj.pixel_map, pixel_aberrations, out=pixel_aberrations)
+        pixel_aberrations -= pixel_aberrations.mean(axis=(1, 2), keepdims=True)
+        self.pixel_aberrations = pixel_aberrations
 
         # Calculate magnification for horizontal and vertical axes
         mag_y = np.abs((self.distance + self.defocus_y) / self.defocus_y)
@@ -698,8 +940,10 @@ class STData(DataContainer):
 
         # dTheta = delta_pix / distance / magnification * du
         # Phase = 2 * pi / wavelength * Integrate[dTheta, delta_pix]
-        phase = ct_integrate(sy_arr=self.y_pixel_size**2 / dist_y / mag_y * dpm_y,
-                             sx_arr=self.x_pixel_size**2 / dist_x / mag_x * dpm_x)
+        s_arr = np.empty_like(pixel_aberrations)
+        np.multiply(pixel_aberrations[0], self.y_pixel_size**2 / dist_y / mag_y, out=s_arr[0])
+        np.multiply(pixel_aberrations[1], self.x_pixel_size**2 / dist_x / mag_x, out=s_arr[1])
+        phase = ct_integrate(sy_arr=s_arr[0], sx_arr=s_arr[1])
         self.phase = 2.0 * np.pi / self.wavelength * phase
         self.reference_image = st_obj.reference_image
         self.scale_map = st_obj.scale_map
@@ -837,7 +1081,8 @@ class STData(DataContainer):
 
         r_vals = []
         extra = {'reference_image': [], 'r_image': []}
-        kernel = np.ones(int(size)) / size
+        size = int(size)
+        mean_buf, r_buf = None, None
         df0_x, df0_y = defoci_x.mean(), defoci_y.mean()
         st_obj = self.update_defocus(df0_x, df0_y).get_st(ds_y=ds_y, ds_x=ds_x,
                                                           aberrations=aberrations,
@@ -845,29 +1090,39 @@ class STData(DataContainer):
         if hval is None:
             hval = st_obj.find_hopt(method=ref_method)
 
-        for df1_x, df1_y in tqdm(zip(defoci_x.ravel(), defoci_y.ravel()),
-                               total=defoci_x.size, disable=not verbose,
-                               desc='Generating defocus sweep'):
-            st_obj.di_pix *= np.abs(df0_y / df1_y)
-            st_obj.dj_pix *= np.abs(df0_x / df1_x)
-            df0_x, df0_y = df1_x, df1_y
+        # Every defocus is derived from the initial translations independently
+        di_pix, dj_pix = st_obj.di_pix.copy(), st_obj.dj_pix.copy()
+        scales_x = np.abs(df0_x / defoci_x.ravel())
+        scales_y = np.abs(df0_y / defoci_y.ravel())
+        for scale_x, scale_y in tqdm(zip(scales_x, scales_y),
+                                     total=scales_x.size, disable=not verbose,
+                                     desc='Generating defocus sweep'):
+            np.multiply(di_pix, scale_y, out=st_obj.di_pix)
+            np.multiply(dj_pix, scale_x, out=st_obj.dj_pix)
             st_obj.update_reference.inplace_update(hval=hval, method=ref_method)
-            extra['reference_image'].append(st_obj.reference_image)
-            mean = st_obj.reference_image.copy()
-            mean_sq = st_obj.reference_image**2
-            if st_obj.reference_image.shape[0] > size:
-                mean = fft_convolve(mean, kernel, mode='reflect', axis=0,
-                                    num_threads=self.num_threads)[size // 2:-size // 2]
-                mean_sq = fft_convolve(mean_sq, kernel, mode='reflect', axis=0,
-                                       num_threads=self.num_threads)[size // 2:-size // 2]
-            if st_obj.reference_image.shape[1] > size:
-                mean = fft_convolve(mean, kernel, mode='reflect', axis=1,
-                                    num_threads=self.num_threads)[:, size // 2:-size // 2]
-                mean_sq = fft_convolve(mean_sq, kernel, mode='reflect', axis=1,
-                                       num_threads=self.num_threads)[:, size // 2:-size // 2]
-            r_image = (mean_sq - mean**2) / mean**2
-            extra['r_image'].append(r_image)
-            r_vals.append(np.mean(r_image))
+            shape = st_obj.reference_image.shape
+            axes = [axis for axis in range(2) if shape[axis] > size]
+            # The buffers are reused unless r_image is returned to the user
+            if mean_buf is None or mean_buf.shape != shape:
+                mean_buf, r_buf = np.empty(shape), np.empty(shape)
+            elif return_extra:
+                r_buf = np.empty(shape)
+            mean = _box_mean(st_obj.reference_image, size, axes, out=mean_buf)
+            np.square(st_obj.reference_image, out=r_buf)
+            mean_sq = _box_mean(r_buf, size, axes, out=r_buf)
+            # Discard the borders affected by the boundary condition
+            crop = tuple(slice(size // 2, -size // 2) if axis in axes else slice(None)
+                         for axis in range(2))
+            mean, mean_sq = mean[crop], mean_sq[crop]
+            # (mean_sq - mean**2) / mean**2 evaluated in place, the offset is
+            # applied to the whole image only if it's returned
+            r_image = np.divide(mean_sq, mean, out=mean_sq)
+            r_image /= mean
+            r_vals.append(np.mean(r_image) - 1.0)
+            if return_extra:
+                r_image -= 1.0
+                extra['reference_image'].append(st_obj.reference_image)
+                extra['r_image'].append(r_image)
 
         if return_extra:
             return r_vals, extra
@@ -899,15 +1154,27 @@ class STData(DataContainer):
         else:
             dtypes = SpeckleTracking.dtypes_64
 
-        data = np.asarray((self.mask * self.data)[self.good_frames],
-                          order='C', dtype=dtypes['data'])
+        # Masked frames are copied one by one straight into the output type
+        data = np.zeros((self.good_frames.size,) + self.shape[1:], dtype=dtypes['data'])
+        for out, frame in zip(data, self.good_frames):
+            np.copyto(out, self.data[frame], casting='unsafe', where=self.mask[frame])
         whitefield = np.asarray(self.whitefield, order='C', dtype=dtypes['whitefield'])
         dij_pix = np.asarray(np.swapaxes(self.pixel_translations[self.good_frames], 0, 1),
                              order='C', dtype=dtypes['dij_pix'])
 
         if ff_correction and self.whitefields is not None:
-            np.rint(data * np.where(self.whitefields > 0, whitefield / self.whitefields, 1.),
-                    out=data, casting='unsafe')
+            # whitefields are given either for every frame or for the good frames only
+            if self.whitefields.shape[0] == self.data.shape[0]:
+                frames = self.good_frames
+            else:
+                frames = np.arange(self.whitefields.shape[0])
+            ratio = np.empty(self.shape[1:])
+            for out, frame in zip(data, frames):
+                ratio.fill(1.0)
+                np.divide(whitefield, self.whitefields[frame], out=ratio,
+                          where=self.whitefields[frame] > 0)
+                ratio *= out
+                np.rint(ratio, out=out, casting='unsafe')
 
         pixel_map = self.pixel_map(dtype=dtypes['pixel_map'])
 
@@ -956,23 +1223,38 @@ class STData(DataContainer):
             raise ValueError(f'invalid axis value: {axis:d}')
 
         data_dict['defocus'] = np.abs(data_dict['defocus'])
+        # Both reductions stream along the rows of a C-ordered array
+        pixel_aberrations = np.mean(data_dict['pixel_aberrations'][axis], axis=1 - axis)
         if center <= self.shape[axis - 2]:
             data_dict['pixels'] = np.arange(self.shape[axis - 2]) - center
-            data_dict['pixel_aberrations'] = data_dict['pixel_aberrations'][axis].mean(axis=1 - axis)
+            data_dict['pixel_aberrations'] = pixel_aberrations
         elif center >= self.shape[axis - 2] - 1:
-            data_dict['pixels'] = center - np.arange(self.shape[axis - 2])
-            idxs = np.argsort(data_dict['pixels'])
-            data_dict['pixel_aberrations'] = -data_dict['pixel_aberrations'][axis].mean(axis=1 - axis)[idxs]
-            data_dict['pixels'] = data_dict['pixels'][idxs]
+            data_dict['pixels'] = np.arange(center - self.shape[axis - 2] + 1, center + 1)
+            data_dict['pixel_aberrations'] = np.negative(pixel_aberrations[::-1],
+                                                         out=pixel_aberrations[::-1])
         else:
             raise ValueError('Origin must be outside of the region of interest')
 
         return AberrationsFit(parent=ref(self), **data_dict)
 
-    def get_pca(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    def _cor_data(self, frames: np.ndarray) -> np.ndarray:
+        # Frame by frame, so that neither the data nor the mask are gathered into copies
+        dtype = np.promote_types(self.whitefield.dtype, int)
+        cor_data = np.zeros((frames.size,) + self.shape[1:], dtype=dtype)
+        for out, frame in zip(cor_data, frames):
+            np.subtract(self.data[frame], self.whitefield, dtype=dtype, where=self.mask[frame],
+                        out=out)
+        return cor_data
+
+    def get_pca(self, dtype: np.dtype=np.float64) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
         """Perform the Principal Component Analysis [PCA]_ of the measured data and
         return a set of eigen flatfields (EFF).
 
+        Args:
+            dtype : Floating point data type used to project the frames and of the
+                output eigen flat-fields. `float32` halves the memory traffic and
+                is sufficient to extract the leading eigen flat-fields.
+
         Returns:
             A tuple of ('cor_data', 'effs', 'eig_vals'). The elements are
             as follows:
@@ -980,7 +1262,7 @@ class STData(DataContainer):
             * `cor_data` : Background corrected stack of measured frames.
             * `effs` : Set of eigen flat-fields.
             * `eig_vals` : Corresponding eigen values for each of the eigen
-              flat-fields.
+              flat-fields, sorted in descending order.
 
         References:
             .. [PCA] Vincent Van Nieuwenhove, Jan De Beenhouwer, Francesco De Carlo,
@@ -990,13 +1272,12 @@ class STData(DataContainer):
         """
         if self._isdata:
 
-            dtype = np.promote_types(self.whitefield.dtype, int)
-            cor_data = np.zeros(self.shape, dtype=dtype)[self.good_frames]
-            np.subtract(self.data[self.good_frames], self.whitefield, dtype=dtype,
-                        where=self.mask[self.good_frames], out=cor_data)
-            mat_svd = np.tensordot(cor_data, cor_data, axes=((1, 2), (1, 2)))
-            eig_vals, eig_vecs = np.linalg.eig(mat_svd)
-            effs = np.tensordot(eig_vecs, cor_data, axes=((0,), (0,)))
+            cor_data = self._cor_data(self.good_frames)
+            mat = cor_data.reshape(cor_data.shape[0], -1).astype(dtype, copy=False)
+            gram = (mat @ mat.T).astype(np.float64, copy=False)
+            eig_vals, eig_vecs = np.linalg.eigh(gram)
+            eig_vals, eig_vecs = eig_vals[::-1], eig_vecs[:, ::-1]
+            effs = (eig_vecs.T.astype(dtype) @ mat).reshape((-1,) + cor_data.shape[1:])
             return cor_data, effs, eig_vals / eig_vals.sum()
 
         raise AttributeError('Data has not been loaded')
@@ -1045,16 +1326,15 @@ class STData(DataContainer):
                                             num_threads=self.num_threads)
             elif method == 'pca':
                 if cor_data is None:
-                    dtype = np.promote_types(self.whitefield.dtype, int)
-                    cor_data = np.zeros(self.shape, dtype=dtype)
-                    np.subtract(self.data, self.whitefield, dtype=dtype,
-                                where=self.mask, out=cor_data)
+                    cor_data = self._cor_data(np.arange(self.data.shape[0]))
                 if effs is None:
                     raise ValueError('No eigen flat fields were provided')
 
-                weights = np.tensordot(cor_data, effs, axes=((1, 2), (1, 2)))
-                weights /= np.sum(effs * effs, axis=(1, 2))
-                whitefields = np.tensordot(weights, effs, axes=((1,), (0,)))
+                mat = np.ascontiguousarray(cor_data).reshape(cor_data.shape[0], -1)
+                effs_mat = np.ascontiguousarray(effs).reshape(effs.shape[0], -1)
+                weights = mat @ effs_mat.T
+                weights /= np.einsum('ij,ij->i', effs_mat, effs_mat)
+                whitefields = (weights @ effs_mat).reshape((-1,) + effs.shape[1:])
                 whitefields += self.whitefield
             else:
                 raise ValueError('Invalid method argument')
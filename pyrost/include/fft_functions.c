@@ -4,6 +4,120 @@
 typedef int (*fft_func)(void *plan, double complex *inp);
 typedef int (*rfft_func)(void *plan, double *inp, size_t npts);
 
+/* Kernels shorter than that are convolved directly, the FFT doesn't pay off */
+#define DIRECT_KSIZE(flen) (2 * (size_t)log2((double)(flen)))
+
+/*---------------------------------------------------------------------------
+    Direct convolution. Evaluates the same circular convolution of the
+    extended line as the FFT routines below, so that both paths yield
+    identical outputs.
+---------------------------------------------------------------------------*/
+
+static void rdirect_convolve_calc(line out, double *inp, double *buf, double *krn, size_t ksize,
+    size_t flen)
+{
+    /* Unroll the circular window of the extended line that contributes to the output */
+    int kstart = ((int)flen - (int)ksize) - ((int)flen - (int)ksize) / 2;
+    int start = (int)flen - ((int)out->npts / 2 + kstart + (int)ksize - 1) % (int)flen;
+    for (int i = 0; i < (int)(out->npts + ksize) - 1; i++) buf[i] = inp[(start + i) % (int)flen];
+
+    double sum;
+    for (int i = 0; i < (int)out->npts; i++)
+    {
+        sum = 0.0;
+        for (int k = 0; k < (int)ksize; k++) sum += krn[k] * buf[i + (int)ksize - 1 - k];
+        ((double *)out->data)[i * out->stride] = sum;
+    }
+}
+
+static void cdirect_convolve_calc(line out, double complex *inp, double complex *buf,
+    double complex *krn, size_t ksize, size_t flen)
+{
+    /* Unroll the circular window of the extended line that contributes to the output */
+    int kstart = ((int)flen - (int)ksize) - ((int)flen - (int)ksize) / 2;
+    int start = (int)flen - ((int)out->npts / 2 + kstart + (int)ksize - 1) % (int)flen;
+    for (int i = 0; i < (int)(out->npts + ksize) - 1; i++) buf[i] = inp[(start + i) % (int)flen];
+
+    double complex sum;
+    for (int i = 0; i < (int)out->npts; i++)
+    {
+        sum = 0.0;
+        for (int k = 0; k < (int)ksize; k++) sum += krn[k] * buf[i + (int)ksize - 1 - k];
+        ((double complex *)out->data)[i * out->stride] = sum;
+    }
+}
+
+static int rdirect_convolve(double *out, double *inp, int ndim, const size_t *dims, double *krn,
+    size_t ksize, int axis, EXTEND_MODE mode, double cval, size_t flen, unsigned threads)
+{
+    array oarr = new_array(ndim, dims, sizeof(double), (void *)out);
+    array iarr = new_array(ndim, dims, sizeof(double), (void *)inp);
+
+    size_t repeats = iarr->size / iarr->dims[axis];
+    threads = (threads > (unsigned)repeats) ? (unsigned)repeats : threads;
+
+    #pragma omp parallel num_threads(threads)
+    {
+        double *inpbuf = MALLOC(double, flen);
+        double *buf = MALLOC(double, flen);
+
+        line iline = init_line(iarr, axis);
+        line oline = init_line(oarr, axis);
+        #pragma omp for
+        for (int i = 0; i < (int)repeats; i++)
+        {
+            UPDATE_LINE(iline, i);
+            UPDATE_LINE(oline, i);
+            extend_line((void *)inpbuf, flen, iline, mode, (void *)&cval);
+            rdirect_convolve_calc(oline, inpbuf, buf, krn, ksize, flen);
+        }
+
+        DEALLOC(iline); DEALLOC(oline);
+        DEALLOC(inpbuf); DEALLOC(buf);
+    }
+
+    free_array(iarr);
+    free_array(oarr);
+
+    return 0;
+}
+
+static int cdirect_convolve(double complex *out, double complex *inp, int ndim, const size_t *dims,
+    double complex *krn, size_t ksize, int axis, EXTEND_MODE mode, double complex cval, size_t flen,
+    unsigned threads)
+{
+    array oarr = new_array(ndim, dims, sizeof(double complex), (void *)out);
+    array iarr = new_array(ndim, dims, sizeof(double complex), (void *)inp);
+
+    size_t repeats = iarr->size / iarr->dims[axis];
+    threads = (threads > (unsigned)repeats) ? (unsigned)repeats : threads;
+
+    #pragma omp parallel num_threads(threads)
+    {
+        double complex *inpbuf = MALLOC(double complex, flen);
+        double complex *buf = MALLOC(double complex, flen);
+
+        line iline = init_line(iarr, axis);
+        line oline = init_line(oarr, axis);
+        #pragma omp for
+        for (int i = 0; i < (int)repeats; i++)
+        {
+            UPDATE_LINE(iline, i);
+            UPDATE_LINE(oline, i);
+            extend_line((void *)inpbuf, flen, iline, mode, (void *)&cval);
+            cdirect_convolve_calc(oline, inpbuf, buf, krn, ksize, flen);
+        }
+
+        DEALLOC(iline); DEALLOC(oline);
+        DEALLOC(inpbuf); DEALLOC(buf);
+    }
+
+    free_array(iarr);
+    free_array(oarr);
+
+    return 0;
+}
+
 static int rfft_convolve_calc(void *rfft_plan, void *irfft_plan, line out, double *inp,
     double *krn, size_t flen, rfft_func rfft, rfft_func irfft)
 {
@@ -44,13 +158,17 @@ int rfft_convolve_np(double *out, double *inp, int ndim, const size_t *dims,
     if (axis < 0 || axis >= ndim) {ERROR("fft_convolve_np: invalid axis."); return -1;}
     if (threads == 0) {ERROR("fft_convolve_np: threads must be positive."); return -1;}
 
+    size_t flen = good_size(dims[axis] + ksize - 1);
+    if (ksize < DIRECT_KSIZE(flen))
+        return rdirect_convolve(out, inp, ndim, dims, krn, ksize, axis, mode, cval, flen,
+                                threads);
+
     double zerro = 0.;
     array oarr = new_array(ndim, dims, sizeof(double), (void *)out);
     array iarr = new_array(ndim, dims, sizeof(double), (void *)inp);
     line kline = new_line(ksize, 1, sizeof(double), krn);
     
     int fail = 0;
-    size_t flen = good_size(iarr->dims[axis] + ksize - 1);
     size_t repeats = iarr->size / iarr->dims[axis];
     threads = (threads > (unsigned) repeats) ? (unsigned) repeats : threads;
 
@@ -97,13 +215,17 @@ int cfft_convolve_np(double complex *out, double complex *inp, int ndim, const s
     if (axis < 0 || axis >= ndim) {ERROR("fft_convolve_np: invalid axis."); return -1;}
     if (threads == 0) {ERROR("fft_convolve_np: threads must be positive."); return -1;}
 
+    size_t flen = good_size(dims[axis] + ksize - 1);
+    if (ksize < DIRECT_KSIZE(flen))
+        return cdirect_convolve(out, inp, ndim, dims, krn, ksize, axis, mode, cval, flen,
+                                threads);
+
     double complex zerro = 0.;
     array oarr = new_array(ndim, dims, sizeof(double complex), (void *)out);
     array iarr = new_array(ndim, dims, sizeof(double complex), (void *)inp);
     line kline = new_line(ksize, 1, sizeof(double complex), krn);
     
     int fail = 0;
-    size_t flen = good_size(iarr->dims[axis] + ksize - 1);
     size_t repeats = iarr->size / iarr->dims[axis];
     threads = (threads > (unsigned) repeats) ? (unsigned) repeats : threads;
 
@@ -150,13 +272,17 @@ int rfft_convolve_fftw(double *out, double *inp, int ndim, const size_t *dims,
     if (axis < 0 || axis >= ndim) {ERROR("fft_convolve_np: invalid axis."); return -1;}
     if (threads == 0) {ERROR("fft_convolve_np: threads must be positive."); return -1;}
 
+    size_t flen = next_fast_len_fftw(dims[axis] + ksize - 1);
+    if (ksize < DIRECT_KSIZE(flen))
+        return rdirect_convolve(out, inp, ndim, dims, krn, ksize, axis, mode, cval, flen,
+                                threads);
+
     double zerro = 0.;
     array oarr = new_array(ndim, dims, sizeof(double), (void *)out);
     array iarr = new_array(ndim, dims, sizeof(double), (void *)inp);
     line kline = new_line(ksize, 1, sizeof(double), krn);
     
     int fail = 0;
-    size_t flen = next_fast_len_fftw(iarr->dims[axis] + ksize - 1);
     size_t repeats = iarr->size / iarr->dims[axis];
     threads = (threads > (unsigned)repeats) ? (unsigned)repeats : threads;
 
@@ -214,13 +340,17 @@ int cfft_convolve_fftw(double complex *out, double complex *inp, int ndim, const
     if (axis < 0 || axis >= ndim) {ERROR("fft_convolve_np: invalid axis."); return -1;}
     if (threads == 0) {ERROR("fft_convolve_np: threads must be positive."); return -1;}
 
+    size_t flen = next_fast_len_fftw(dims[axis] + ksize - 1);
+    if (ksize < DIRECT_KSIZE(flen))
+        return cdirect_convolve(out, inp, ndim, dims, krn, ksize, axis, mode, cval, flen,
+                                threads);
+
     double complex zerro = 0.;
     array oarr = new_array(ndim, dims, sizeof(double complex), (void *)out);
     array iarr = new_array(ndim, dims, sizeof(double complex), (void *)inp);
     line kline = new_line(ksize, 1, sizeof(double complex), krn);
     
     int fail = 0;
-    size_t flen = next_fast_len_fftw(iarr->dims[axis] + ksize - 1);
     size_t repeats = iarr->size / iarr->dims[axis];
     threads = (threads > (unsigned)repeats) ? (unsigned)repeats : threads;
 
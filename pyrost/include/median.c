@@ -105,7 +105,7 @@ int median(void *out, void *inp, unsigned char *mask, int ndim, const size_t *di
         line iline = init_line(iarr, axis);
         line mline = init_line(marr, axis);
 
-        #pragma omp for
+        #pragma omp for schedule(guided)
         for (int i = 0; i < (int)repeats; i++)
         {
             UPDATE_LINE(iline, i);
@@ -184,4 +184,162 @@ int median_filter(void *out, void *inp, unsigned char *mask, unsigned char *imas
     free_array(iarr); DEALLOC(imarr);
 
     return 0;
-}
\ No newline at end of file
+}
+
+static int extend_index(int coord, int dim, EXTEND_MODE mode)
+{
+    if (coord >= 0 && coord < dim) return coord;
+
+    int period;
+    switch (mode)
+    {
+        /* kkkkkkkk|abcd|kkkkkkkk */
+        case EXTEND_CONSTANT:
+            return -1;
+
+        /* aaaaaaaa|abcd|dddddddd */
+        case EXTEND_NEAREST:
+            return (coord < 0) ? 0 : dim - 1;
+
+        /* cbabcdcb|abcd|cbabcdcb */
+        case EXTEND_MIRROR:
+            if (dim == 1) return 0;
+            period = 2 * dim - 2;
+            coord = ((coord % period) + period) % period;
+            return (coord < dim) ? coord : period - coord;
+
+        /* abcddcba|abcd|dcbaabcd */
+        case EXTEND_REFLECT:
+            period = 2 * dim;
+            coord = ((coord % period) + period) % period;
+            return (coord < dim) ? coord : period - coord - 1;
+
+        /* abcdabcd|abcd|abcdabcd */
+        case EXTEND_WRAP:
+            return ((coord % dim) + dim) % dim;
+
+        default:
+            ERROR("extend_index: invalid extend mode.");
+            return -1;
+    }
+}
+
+static void update_hist(int *hist, int *count, int *lt, int med, int sign, long *rows, size_t nrows,
+    int col, unsigned short *inp, unsigned char *imask, unsigned short cval)
+{
+    unsigned short val;
+    for (int i = 0; i < (int)nrows; i++)
+    {
+        if (rows[i] < 0 || col < 0) val = cval;
+        else if (imask[rows[i] + col]) val = inp[rows[i] + col];
+        else continue;
+
+        hist[val] += sign; *count += sign;
+        if (val < med) *lt += sign;
+    }
+}
+
+static void store_uint(void *out, size_t idx, size_t size, unsigned long val)
+{
+    switch (size)
+    {
+        case 1: ((unsigned char *)out)[idx] = val; break;
+        case 2: ((unsigned short *)out)[idx] = val; break;
+        case 4: ((unsigned int *)out)[idx] = val; break;
+        default: ((unsigned long *)out)[idx] = val;
+    }
+}
+
+int median_filter_hist(void *out, size_t out_size, unsigned short *inp, unsigned char *mask, unsigned char *imask,
+    int ndim, const size_t *dims, size_t nbins, size_t *fsize, EXTEND_MODE mode, unsigned short cval,
+    unsigned long offset, unsigned threads)
+{
+    /* check parameters */
+    if (!out || !inp || !mask || !imask || !dims || !fsize)
+    {ERROR("median_filter_hist: one of the arguments is NULL."); return -1;}
+    if (ndim <= 0) {ERROR("median_filter_hist: ndim must be positive."); return -1;}
+    if (nbins == 0) {ERROR("median_filter_hist: nbins must be positive."); return -1;}
+    if (out_size != 1 && out_size != 2 && out_size != 4 && out_size != 8)
+    {ERROR("median_filter_hist: invalid output item size."); return -1;}
+    if (threads == 0) {ERROR("median_filter_hist: threads must be positive."); return -1;}
+    for (int n = 0; n < ndim; n++)
+    {if (!fsize[n]) {ERROR("median_filter_hist: footprint size must be positive."); return -1;}}
+
+    array iarr = new_array(ndim, dims, sizeof(unsigned short), inp);
+
+    if (!iarr->size) {free_array(iarr); return 0;}
+
+    /* tables of the extended coordinates along each axis */
+    int **tables = MALLOC(int *, ndim);
+    for (int n = 0; n < ndim; n++)
+    {
+        tables[n] = MALLOC(int, dims[n] + fsize[n] - 1);
+        for (int j = 0; j < (int)(dims[n] + fsize[n] - 1); j++)
+        {tables[n][j] = extend_index(j - (int)fsize[n] / 2, dims[n], mode);}
+    }
+
+    int xdim = dims[ndim - 1], fx = fsize[ndim - 1];
+    int repeats = iarr->size / xdim;
+    size_t nrows = 1;
+    for (int n = 0; n < ndim - 1; n++) nrows *= fsize[n];
+
+    threads = (threads > (unsigned)repeats) ? (unsigned)repeats : threads;
+
+    #pragma omp parallel num_threads(threads)
+    {
+        int *hist = (int *)calloc(nbins, sizeof(int));
+        long *rows = MALLOC(long, nrows);
+        int *coord = MALLOC(int, ndim);
+        int count = 0, lt = 0, med = 0, k, index;
+        size_t rem;
+
+        #pragma omp for schedule(guided)
+        for (int i = 0; i < repeats; i++)
+        {
+            index = i * xdim;
+            UNRAVEL_INDEX(coord, &index, iarr);
+
+            /* offsets of the footprint rows, -1 if a row lies outside of the array */
+            for (int j = 0; j < (int)nrows; j++)
+            {
+                rows[j] = 0; rem = j;
+                for (int n = ndim - 2; n >= 0; n--)
+                {
+                    int src = tables[n][coord[n] + rem % fsize[n]];
+                    rem /= fsize[n];
+                    rows[j] = (src < 0 || rows[j] < 0) ? -1 : rows[j] + src * (long)iarr->strides[n];
+                }
+            }
+
+            for (int x = 0; x < fx - 1; x++)
+            {update_hist(hist, &count, &lt, med, 1, rows, nrows, tables[ndim - 1][x], inp, imask, cval);}
+
+            for (int x = 0; x < xdim; x++)
+            {
+                update_hist(hist, &count, &lt, med, 1, rows, nrows, tables[ndim - 1][x + fx - 1], inp, imask, cval);
+
+                if (mask[index + x] && count)
+                {
+                    k = (count & 1) ? count / 2 : count / 2 - 1;
+                    while (lt > k) lt -= hist[--med];
+                    while (lt + hist[med] <= k) lt += hist[med++];
+                    store_uint(out, index + x, out_size, med + offset);
+                }
+                else store_uint(out, index + x, out_size, 0);
+
+                update_hist(hist, &count, &lt, med, -1, rows, nrows, tables[ndim - 1][x], inp, imask, cval);
+            }
+
+            /* empty the histogram for the next line */
+            for (int x = xdim; x < xdim + fx - 1; x++)
+            {update_hist(hist, &count, &lt, med, -1, rows, nrows, tables[ndim - 1][x], inp, imask, cval);}
+        }
+
+        DEALLOC(hist); DEALLOC(rows); DEALLOC(coord);
+    }
+
+    for (int n = 0; n < ndim; n++) DEALLOC(tables[n]);
+    DEALLOC(tables); free_array(iarr);
+
+    return 0;
+}
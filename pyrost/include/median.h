@@ -68,4 +68,38 @@ int median_filter(void *out, void *inp, unsigned char *mask, unsigned char *imas
     size_t item_size, size_t *fsize, unsigned char *fmask, EXTEND_MODE mode, void *cval, int (*compar)(const void*, const void*),
     unsigned threads);
 
+/*-------------------------------------------------------------------------------*/
+/** Calculate a multidimensional median filter with a rectangular footprint using
+    sliding histograms (T. Huang, G. Yang, G. Tang, "A fast two-dimensional median
+    filtering algorithm", 1979). The window slides along the last axis, a column of
+    the footprint is added to and removed from the histogram at each step, and the
+    median bin is tracked incrementally. The cost per output element doesn't depend
+    on the footprint size along the last axis.
+
+    @param out          Buffer of output stack of integer images of shape dims. out[...]
+                        is set to the median bin plus offset, wrapped to the item size,
+                        or to 0 if the median is undefined.
+    @param out_size     Size of an item of out in bytes (1, 2, 4, or 8).
+    @param inp          Buffer of input stack of histogram bins of shape dims. Every bin
+                        must be less than nbins.
+    @param mask         Output mask. Set out[...] to 0 if if mask[...] = 0.
+    @param imask        Input mask. Omit inp[...] during the calculation of a median
+                        if imask[...] = 0.
+    @param ndim         Number of dimensions of inp and out.
+    @param dims         Shape of inp and out.
+    @param nbins        Number of histogram bins.
+    @param fsize        Shape of filter footprint.
+    @param mode         The mode parameter determines how the input array is extended
+                        when the filter overlaps a border. The valid values are the
+                        same as in median_filter.
+    @param cval         Constant bin to fill in the case of EXTEND_CONSTANT.
+    @param offset       Offset added to the median bins.
+    @param threads      Number of threads used during the calculation.
+
+    @return             Returns 0 if it finished normally, 1 otherwise.
+ */
+int median_filter_hist(void *out, size_t out_size, unsigned short *inp, unsigned char *mask, unsigned char *imask,
+    int ndim, const size_t *dims, size_t nbins, size_t *fsize, EXTEND_MODE mode, unsigned short cval,
+    unsigned long offset, unsigned threads);
+
 #endif
\ No newline at end of file
@@ -24,12 +24,11 @@ Examples:
     `ms_prgt.smp_profile` attributes.
 """
 from __future__ import annotations
-from multiprocessing import cpu_count
 from typing import Iterable, Optional, Tuple
 from tqdm.auto import tqdm
 import numpy as np
 from .ms_parameters import MSParams
-from ..data_container import DataContainer, dict_to_object
+from ..data_container import DataContainer, dict_to_object, _available_cpus
 from ..bin import mll_profile, FFTW, empty_aligned, rsc_wp
 
 class MLL(DataContainer):
@@ -199,7 +198,7 @@ class MSPropagator(DataContainer):
         super(MSPropagator, self).__init__(params=params, sample=sample,
                                            num_threads=num_threads, **kwargs)
 
-        self._init_functions(num_threads=lambda: np.clip(1, 64, cpu_count()),
+        self._init_functions(num_threads=lambda: np.clip(1, 64, _available_cpus()),
                              x_arr=self.params.get_xcoords, z_arr=self.params.get_zcoords,
                              fx_arr=lambda: np.fft.fftfreq(self.size, self.params.x_step),
                              kernel=lambda: self.params.get_kernel(self.fx_arr) / self.fx_arr.size,
@@ -15,8 +15,8 @@ Examples:
 from __future__ import annotations
 import os
 from typing import Dict, Iterable, Iterator, Tuple, Union, Optional
-from multiprocessing import cpu_count
 import numpy as np
+from ..data_container import _available_cpus
 from ..ini_parser import INIParser, ROOT_PATH
 from ..bin import bar_positions, barcode_profile, gaussian_kernel
 
@@ -210,7 +210,7 @@ class STParams(INIParser):
             num_threads : Number of threads used in the computations.
         """
         if num_threads is None or num_threads <= 0 or num_threads > 64:
-            num_threads = np.clip(1, 64, cpu_count())
+            num_threads = np.clip(1, 64, _available_cpus())
         self.num_threads = num_threads
 
     def x_wavefront_size(self) -> int:
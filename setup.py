@@ -12,8 +12,12 @@ else:
     USE_CYTHON = True
 
 ext = '.pyx' if USE_CYTHON else '.c'
+compile_args = ['-fopenmp', '-std=c99', '-O3']
+# Tune for the build machine, the binaries are not portable then
+if os.environ.get('PYROST_NATIVE', '0') == '1':
+    compile_args.append('-march=native')
 extension_args = {'language': 'c',
-                  'extra_compile_args': ['-fopenmp', '-std=c99'],
+                  'extra_compile_args': compile_args,
                   'extra_link_args': ['-lgomp', '-Wl,-rpath,/usr/local/lib'],
                   'libraries': ['gsl', 'gslcblas', 'fftw3', 'fftw3f', 'fftw3_omp', 'fftw3f_omp'],
                   'library_dirs': ['/usr/local/lib',
@@ -37,6 +41,7 @@ if USE_CYTHON:
                            compiler_directives={'cdivision': True,
                                                 'boundscheck': False,
                                                 'wraparound': False,
+                                                'initializedcheck': False,
                                                 'binding': True,
                                                 'embedsignature': False})
 
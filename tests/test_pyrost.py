@@ -1,11 +1,14 @@
 import os
 import shutil
+from copy import copy
 from datetime import datetime
 from typing import List, Tuple
 import pytest
 import numpy as np
+from scipy import ndimage
 import pyrost as rst
 from pyrost import simulation as st_sim
+from pyrost.data_processing import _box_mean
 
 @pytest.fixture(params=[{'detx_size': 300, 'dety_size': 300, 'n_frames': 50, 'p0': 1e6,
                          'pix_size': 300, 'bar_size': 0.3, 'bar_rnd': 0.5, 'alpha': 0.05,
@@ -62,6 +65,24 @@ def input_file(scan_num: int) -> rst.CXIStore:
 def good_frames_list(good_frames: Tuple[int, int]) -> np.ndarray:
     return np.arange(good_frames[0], good_frames[1])
 
+@pytest.fixture
+def synth_data(temp_dir: str) -> rst.STData:
+    """Return a small synthetic scan saved to a CXI file.
+    """
+    rng = np.random.default_rng(69)
+    n_frames = 12
+    path = os.path.join(temp_dir, 'synth.cxi')
+    with rst.CXIStore(path, 'w') as cxi_file:
+        cxi_file.save_attribute('data', rng.poisson(100, (n_frames, 8, 40)).astype(np.uint32))
+    basis_vectors = np.tile([[0.0, -1e-4, 0.0], [-1e-4, 0.0, 0.0]], (n_frames, 1, 1))
+    translations = np.stack((np.linspace(0.0, 1e-5, n_frames), np.zeros(n_frames),
+                             np.zeros(n_frames)), axis=1)
+    data = rst.STData(rst.CXIStore(path), basis_vectors=basis_vectors, translations=translations,
+                      distance=2.0, wavelength=7e-11, x_pixel_size=1e-4, y_pixel_size=1e-4,
+                      defocus_x=1e-4)
+    yield data.load('data')
+    os.remove(path)
+
 @pytest.mark.st_sim
 def test_st_params(st_params: st_sim.STParams, ini_path: str):
     assert not os.path.isfile(ini_path)
@@ -95,6 +116,186 @@ def test_st_update_sim(st_converter: st_sim.STConverter, temp_dir: str):
     fit = fit_obj.fit(max_order=2)
     assert np.sum(np.abs(fit['rel_err'])) > 0.0
 
+@pytest.mark.standalone
+def test_transforms():
+    transforms = [rst.Crop([3, 17, 2, 29]), rst.Downscale(3), rst.Mirror(0), rst.Mirror(1)]
+    transforms.append(rst.ComposeTransforms(transforms))
+    frames = np.random.random((4, 20, 31))
+    for transform in transforms:
+        ss_idxs, fs_idxs = transform.index_array(*np.indices(frames.shape[1:]))
+        assert np.all(transform.forward(frames) == frames[..., ss_idxs, fs_idxs])
+
+@pytest.mark.standalone
+def test_transforms_cache():
+    crop = rst.Crop([3, 17, 2, 29])
+    transform = rst.ComposeTransforms([crop, rst.Mirror(1)])
+    frames = np.random.random((4, 20, 31))
+    for trans in (crop, transform):
+        ss_idxs, fs_idxs = trans.indexed(frames.shape[1:])
+        assert np.all(trans.forward(frames) == frames[..., ss_idxs, fs_idxs])
+
+    # Modify the transforms in place, the cached indices must be discarded
+    crop.roi[0] = 5
+    transform[0].roi[1] = 12
+    transform.transforms.append(rst.Downscale(2))
+    for trans, result in [(crop, frames[..., 5:17, 2:29]), (transform, frames[..., 3:12:2, 28:1:-2])]:
+        ss_idxs, fs_idxs = trans.indexed(frames.shape[1:])
+        assert np.all(frames[..., ss_idxs, fs_idxs] == result)
+        assert np.all(trans.forward(frames) == result)
+    crop_copy = copy(crop)
+    assert '_cache' not in crop_copy.__dict__ and crop_copy.roi is not crop.roi
+
+@pytest.mark.standalone
+def test_get_pca(synth_data: rst.STData):
+    data = synth_data.mask_frames(np.arange(2, synth_data.shape[0]))
+    cor_data = data._cor_data(data.good_frames)
+    mat = cor_data.reshape(cor_data.shape[0], -1).astype(np.float64)
+    eig_vals, eig_vecs = np.linalg.eig(mat @ mat.T)
+    idxs = np.argsort(eig_vals)[::-1]
+    eig_vals = eig_vals[idxs] / eig_vals.sum()
+    effs = (eig_vecs[:, idxs].T @ mat).reshape(cor_data.shape)
+
+    for dtype, rtol in [(np.float64, 1e-8), (np.float32, 1e-4)]:
+        pca = data.get_pca(dtype=dtype)
+        assert np.all(pca[0] == cor_data) and pca[1].dtype == dtype
+        assert np.allclose(pca[2], eig_vals, rtol=rtol, atol=rtol * eig_vals[0])
+        # The leading eigen flat-fields are compared, they are defined up to a sign
+        signs = np.sign(np.sum(pca[1][:3] * effs[:3], axis=(1, 2)))
+        assert np.allclose(pca[1][:3] * signs[:, None, None], effs[:3], rtol=rtol,
+                           atol=rtol * np.abs(effs[0]).max())
+
+@pytest.mark.standalone
+def test_fft_convolve():
+    rng = np.random.default_rng(69)
+    inp = rng.random((64, 64))
+    for backend in ['numpy', 'fftw']:
+        for mode in ['constant', 'nearest', 'mirror', 'reflect', 'wrap']:
+            for ksize in (1, 3, 5, 7):
+                kernel = rng.random(ksize)
+                for axis in range(inp.ndim):
+                    out = ndimage.convolve1d(inp, kernel, axis=axis, mode=mode, cval=1.5)
+                    # Short kernels are convolved directly, the zero-padded ones by means of FFT
+                    for krn in (kernel, np.pad(kernel, 20)):
+                        assert np.allclose(rst.bin.fft_convolve(inp, krn, axis=axis, mode=mode,
+                                                                cval=1.5, backend=backend), out)
+
+@pytest.mark.standalone
+def test_forward_slice():
+    for size in (1, 7, 20):
+        arr = np.arange(size)
+        for slc in [slice(None), slice(2, 5), slice(None, None, -1), slice(5, 1, -2),
+                    slice(-3, None), slice(None, None, 3), slice(4, 4), slice(-2, -9, -3)]:
+            read_slc, flip = rst.CXIStore._forward_slice(slc, size)
+            assert read_slc.step is None or read_slc.step > 0
+            assert np.all(arr[read_slc][::-1 if flip else 1] == arr[slc])
+
+@pytest.mark.standalone
+def test_load_transforms(synth_data: rst.STData):
+    transforms = [rst.Crop([1, 6, 3, 31]), rst.Downscale(3), rst.Mirror(0), rst.Mirror(1)]
+    transforms.append(rst.ComposeTransforms(transforms))
+    for transform in transforms:
+        data = rst.STData(synth_data.input_file, transform=transform).load('data', processes=2)
+        assert np.all(data.data == transform.forward(synth_data.data))
+    frame = synth_data.input_file._read_worker_frame(synth_data.input_file._indices['data'][0],
+                                                     slice(None, None, -1), slice(None, None, -1))
+    assert frame.flags.c_contiguous
+
+@pytest.mark.standalone
+def test_ff_correction(synth_data: rst.STData):
+    good_frames = np.arange(2, synth_data.shape[0])
+    data = synth_data.mask_frames(good_frames)
+    _, effs, _ = data.get_pca()
+    # Whitefields for every frame and for the good frames only
+    for cor_data in (None, data._cor_data(good_frames)):
+        st_data = data.update_whitefields(method='pca', cor_data=cor_data, effs=effs)
+        whitefields = st_data.whitefields
+        if whitefields.shape[0] == st_data.data.shape[0]:
+            whitefields = whitefields[good_frames]
+        st_obj = st_data.get_st(ff_correction=True)
+        ratio = np.where(whitefields > 0, st_obj.whitefield / np.where(whitefields > 0, whitefields, 1.0), 1.0)
+        data_cor = np.rint(st_data.data[good_frames] * ratio).astype(st_obj.data.dtype)
+        assert np.all(st_obj.data == data_cor)
+
+@pytest.mark.standalone
+def test_masked_sum():
+    rng = np.random.default_rng(69)
+    for dtype in [bool, np.int8, np.uint8, np.int16, np.uint16, np.int32, np.uint32,
+                  np.int64, np.uint64, np.float16, np.float32, np.float64]:
+        inp = (100 * rng.random((4, 7, 9))).astype(dtype)
+        mask = rng.random(inp.shape) > 0.3
+        for axis in range(-inp.ndim, inp.ndim):
+            data_sum = rst.bin.masked_sum(inp, mask, axis=axis, num_threads=4)
+            assert np.allclose(data_sum, np.sum(inp * mask, axis=axis, dtype=np.float64).astype(data_sum.dtype))
+            if np.issubdtype(dtype, np.floating):
+                assert data_sum.dtype == dtype
+        for axis in (-inp.ndim - 1, inp.ndim):
+            with pytest.raises(ValueError):
+                rst.bin.masked_sum(inp, mask, axis=axis)
+
+@pytest.mark.standalone
+def test_pca_whitefields(synth_data: rst.STData):
+    good_frames = np.arange(2, synth_data.shape[0])
+    data = synth_data.mask_frames(good_frames)
+    cor_data, effs, _ = data.get_pca()
+    # The whitefields are given for the good frames only
+    data = data.update_whitefields(method='pca', cor_data=cor_data, effs=effs)
+    data = data.update_mask(method='perc-bad', pmin=1.0, pmax=99.0)
+    assert data.mask.shape == synth_data.data.shape
+    assert data.whitefield.shape == synth_data.data.shape[1:]
+    data = data.mask_frames(good_frames[1:])
+    assert np.all(data.good_frames == good_frames[1:])
+    assert data.whitefield.shape == synth_data.data.shape[1:]
+
+@pytest.mark.standalone
+def test_hist_quantile():
+    rng = np.random.default_rng(69)
+    arrays = [rng.integers(-1000, 1000, 10000), rng.integers(0, 2**20, 5000).astype(np.int32),
+              rng.integers(-500, 500, 999).astype(np.int16), np.array([-3, -1, -2]),
+              np.array([-1]), np.array([5], dtype=np.int32)]
+    for inp in arrays:
+        for pmin, pmax in [(0.0, 100.0), (10.0, 90.0), (1.0, 99.99), (50.0, 50.0)]:
+            quantiles = rst.bin.hist_quantile(inp, pmin, pmax, num_threads=4)
+            assert np.allclose(quantiles, np.percentile(inp, [pmin, pmax]))
+
+@pytest.mark.standalone
+def test_box_mean():
+    inp = np.random.random((30, 50))
+    for size in (1, 2, 5, 8, 21, 30):
+        for axis in range(inp.ndim):
+            mean = ndimage.uniform_filter1d(inp, size, axis=axis, mode='reflect')
+            assert np.allclose(_box_mean(inp, size, [axis]), mean)
+        mean = ndimage.uniform_filter(inp, size, mode='reflect')
+        assert np.allclose(_box_mean(inp, size, range(inp.ndim)), mean)
+
+@pytest.mark.standalone
+def test_frames_nonempty():
+    for dtype in [bool, np.uint8, np.int16, np.uint32, np.int64, np.float16, np.float32,
+                  np.float64, np.complex128]:
+        inp = np.zeros((8, 5, 300), dtype=dtype)
+        inp[1, 2, 3] = inp[3, -1, -1] = inp[7, 0, 0] = 1
+        if np.issubdtype(dtype, np.inexact):
+            inp[4] = -0.0
+            inp[5, 1, 1] = np.nan
+            inp[6, 0, 5] = -1e-3
+        out = rst.bin.frames_nonempty(inp, num_threads=4)
+        assert np.all(out == np.any(inp, axis=(1, 2)))
+
+@pytest.mark.standalone
+def test_median_filter():
+    rng = np.random.default_rng(69)
+    for dtype in [np.int8, np.uint8, np.int16, np.uint16, np.int32, np.uint32, np.int64, np.uint64]:
+        vmin = -100 if np.issubdtype(dtype, np.signedinteger) else 0
+        inp = rng.integers(vmin, vmin + 200, (6, 13, 17)).astype(dtype)
+        for mode in ['constant', 'nearest', 'mirror', 'reflect', 'wrap']:
+            for size in [(1, 3, 3), (3, 5, 5), (3, 1, 7), (2, 1, 6)]:
+                out = rst.bin.median_filter(inp, size, mode=mode, kind='histogram', num_threads=4)
+                # scipy centers the even-sized filters differently
+                if all(length % 2 for length in size):
+                    assert np.all(out == ndimage.median_filter(inp, size, mode=mode))
+                if dtype in [np.int32, np.uint32, np.uint64]:
+                    assert np.all(out == rst.bin.median_filter(inp, size, mode=mode, kind='sort',
+                                                               num_threads=4))
+
 @pytest.mark.rst
 def test_load_exp(kamzik_converter: rst.KamzikConverter, input_file: rst.CXIStore):
     log_data = kamzik_converter.cxi_get(['basis_vectors', 'log_translations'])